@@ -2,13 +2,18 @@ import argparse
 import asyncio
 import datetime
 import logging
-import os
+import math
+import pathlib
 import sys
-import wave
+import threading
 
+import numba
 import numpy as np
 import websockets
 
+from app.ring_buffer import ByteRingBuffer
+from app.wave_writer import RawWaveWriter
+
 try:
     import pyaudio
 except ImportError:
@@ -25,70 +30,176 @@ logger = logging.getLogger(__name__)
 # --- 常量配置 ---
 SAMPLE_RATE = 16000
 AUDIO_FORMAT = pyaudio.paInt16
+SAMPLE_WIDTH = 2  # paInt16 的每个采样点固定为 2 字节
 CHANNELS = 1
 SAMPLES_PER_CHUNK = int(SAMPLE_RATE * 30 / 1000)  # 30ms chunks
-RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "..", "recordings")
-os.makedirs(RECORDINGS_DIR, exist_ok=True)
+# 每个环形缓冲区至少可容纳 64 个音频块 (约 2 秒音频)
+RING_BUFFER_CAPACITY = 64 * SAMPLES_PER_CHUNK * SAMPLE_WIDTH
+# 每毫秒音频的字节数
+BYTES_PER_MS = SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS // 1000
+# 网络任务检查环形缓冲区的最长间隔 (秒)：一个音频块的时长
+NETWORK_POLL_INTERVAL = SAMPLES_PER_CHUNK / SAMPLE_RATE
+# WebSocket 发送缓冲区的高水位线 (字节)
+WS_WRITE_LIMIT = 1 << 20
+# 后台写入线程刷新录音文件的间隔 (秒)，以及每次从环形缓冲区取出的最大字节数
+FILE_FLUSH_INTERVAL = 0.5
+FILE_WRITE_BLOCK_SIZE = 64 * 1024
+# 音量条: RMS 达到 10000 时视为满格，并使用指数移动平均 (EMA) 平滑显示
+VU_SCALE = 1.0 / 10000
+VU_EMA_DECAY = 0.7
+VU_EMA_GAIN = 1.0 - VU_EMA_DECAY
+# TUI 的刷新间隔 (秒) 和音量条宽度；所有可能的音量条字符串预先生成
+TUI_REFRESH_INTERVAL = 0.1
+TUI_BAR_WIDTH = 40
+TUI_BARS = ["█" * k + "-" * (TUI_BAR_WIDTH - k) for k in range(TUI_BAR_WIDTH + 1)]
+RECORDINGS_DIR = pathlib.Path(__file__).resolve().parent.parent / "recordings"
+RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@numba.njit(nogil=True, fastmath=True, cache=True)
+def update_vu_level(samples: np.ndarray, prev_level: float) -> float:
+    """
+    计算一个 16 位音频块的 RMS，并用 EMA 更新音量值。
+
+    这是一个编译为机器码、且不持有 GIL 的内核：在一次循环中累加平方和，
+    不产生任何临时数组。空的音频块会原样返回之前的音量值。
+    """
+    num_samples = samples.size
+    if num_samples == 0:
+        return prev_level
+    sum_of_squares = 0.0
+    for sample in samples:
+        value = float(sample)
+        sum_of_squares += value * value
+    rms = math.sqrt(sum_of_squares / num_samples)
+    vu_level = min(rms * VU_SCALE, 1.0)
+    return prev_level * VU_EMA_DECAY + vu_level * VU_EMA_GAIN
 
 
 class AppState:
-    """一个简单的类，用于在不同的异步任务之间共享状态。"""
+    """一个简单的类，用于在不同的异步任务之间共享状态。必须在事件循环中创建。"""
 
     def __init__(self):
         self.status_text = "正在初始化..."
         self.vu_level = 0.0
+        # 供音频回调线程读取的运行标志
         self.is_running = True
+        # 供异步任务等待的关闭信号。它是一个可被多个任务同时等待的 Future，
+        # 任务在两次工作之间等待它 (带超时)，收到关闭请求时会被立即唤醒。
+        self.shutdown_requested: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    def request_shutdown(self):
+        """请求所有任务停止。只能在事件循环线程中调用，重复调用是安全的。"""
+        self.is_running = False
+        if not self.shutdown_requested.done():
+            self.shutdown_requested.set_result(None)
+
+    async def wait_for_shutdown(self, timeout: float) -> bool:
+        """
+        最多等待 `timeout` 秒，期间收到关闭请求时立即返回。
+
+        返回:
+            bool: 是否已经请求关闭。
+        """
+        await asyncio.wait((self.shutdown_requested,), timeout=timeout)
+        return self.shutdown_requested.done()
 
 
 class MicrophoneProcessor:
     """
-    负责从麦克风捕获音频，计算音量，并将音频数据放入队列以供网络发送和文件保存。
+    负责从麦克风捕获音频，计算音量，并将音频数据写入环形缓冲区以供网络发送和文件保存。
     """
 
-    def __init__(self, state: AppState):
+    def __init__(self, state: AppState, network_capacity: int = RING_BUFFER_CAPACITY):
+        """
+        参数:
+            state (AppState): 共享的应用状态。
+            network_capacity (int): 网络发送环形缓冲区的容量 (字节)。
+        """
         self.p_audio = pyaudio.PyAudio()
         self.state = state
-        self.loop = asyncio.get_event_loop()
-        self.network_queue = asyncio.Queue()
-        self.file_queue = asyncio.Queue()
+        # 实时回调线程直接写入预分配的环形缓冲区，异步任务按各自的节奏读取。
+        self.network_buffer = ByteRingBuffer(network_capacity)
+        self.file_buffer = ByteRingBuffer(RING_BUFFER_CAPACITY)
+        # 预热音量计算内核，使 JIT 编译发生在启动时而不是第一次实时回调中。
+        # np.frombuffer 返回只读数组，预热时使用相同的类型，避免回调中再次编译。
+        update_vu_level(np.frombuffer(bytes(SAMPLES_PER_CHUNK * SAMPLE_WIDTH), dtype=np.int16), 0.0)
         self.stream: pyaudio.Stream | None = None
-        self.wave_file: wave.Wave_write | None = None
+        self.wave_file: RawWaveWriter | None = None
         self.wave_filename: str | None = None
+        self._writer_thread: threading.Thread | None = None
+        self._writer_stop = threading.Event()
+        self._drop_reported = False
 
     def _setup_wave_file(self):
         """配置并打开一个WAV文件用于录音。"""
         filename_base = f"cli_recording_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-        self.wave_filename = os.path.join(RECORDINGS_DIR, filename_base)
+        self.wave_filename = str(RECORDINGS_DIR / filename_base)
         try:
-            wf = wave.open(self.wave_filename, "wb")
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(self.p_audio.get_sample_size(AUDIO_FORMAT))
-            wf.setframerate(SAMPLE_RATE)
-            self.wave_file = wf
-            self.state.status_text = f"录音将保存到: {os.path.basename(self.wave_filename)}"
+            self.wave_file = RawWaveWriter(
+                self.wave_filename,
+                channels=CHANNELS,
+                sample_rate=SAMPLE_RATE,
+                sample_width=SAMPLE_WIDTH,
+            )
+            self.state.status_text = f"录音将保存到: {filename_base}"
             logger.info(f"录音文件已准备就绪: {self.wave_filename}")
         except Exception as e:
             logger.error(f"无法创建录音文件 {self.wave_filename}: {e}")
             self.wave_file = None
             self.wave_filename = None
 
+    def _drain_file_buffer(self, wf: RawWaveWriter):
+        """将文件环形缓冲区中当前所有的音频按块写入 WAV 文件。"""
+        while segments := self.file_buffer.peek(FILE_WRITE_BLOCK_SIZE):
+            # 环形缓冲区的视图直接通过一次 writev 提交，无需先复制成新的字节串。
+            wf.write_segments(segments)
+            self.file_buffer.consume(sum(len(segment) for segment in segments))
+
+    def _wave_writer_loop(self):
+        """后台写入线程：定期批量写入录音数据，使文件 I/O 不再占用事件循环。"""
+        wf = self.wave_file
+        if not wf:
+            return
+
+        logger.info("文件保存线程已启动。")
+        try:
+            while not self._writer_stop.wait(FILE_FLUSH_INTERVAL):
+                self._drain_file_buffer(wf)
+            # 写入停止前剩余在缓冲区中的音频
+            self._drain_file_buffer(wf)
+        except Exception as e:
+            logger.error(f"写入录音文件时发生错误: {e}")
+        finally:
+            # 关闭时回填 WAV 文件头中的长度字段
+            wf.close()
+            logger.info(f"录音文件已成功保存和关闭: {self.wave_filename}")
+
     def _pyaudio_callback(self, in_data, frame_count, time_info, status):
         """PyAudio的实时回调函数。警告：不要在此函数中执行任何阻塞操作！"""
         if self.state.is_running:
             audio_data = np.frombuffer(in_data, dtype=np.int16)
-            rms = np.sqrt(np.mean(audio_data.astype(float) ** 2))
-            vu_level = min(rms / 10000, 1.0)
-            self.state.vu_level = self.state.vu_level * 0.7 + vu_level * 0.3
+            self.state.vu_level = update_vu_level(audio_data, self.state.vu_level)
 
-            self.loop.call_soon_threadsafe(self.network_queue.put_nowait, in_data)
+            dropped = not self.network_buffer.push(in_data)
             if self.wave_file:
-                self.loop.call_soon_threadsafe(self.file_queue.put_nowait, in_data)
+                dropped = not self.file_buffer.push(in_data) or dropped
+            # 回调中不能写日志 (会加锁并执行 I/O)，只在首次丢弃时更新状态行提示用户，
+            # 丢弃的总量在 `stop` 中统一报告。
+            if dropped and not self._drop_reported:
+                self._drop_reported = True
+                self.state.status_text = "警告: 音频缓冲区已满，部分音频被丢弃"
 
         return (None, pyaudio.paContinue)
 
     def start(self):
         """打开麦克风流并开始录音。"""
         self._setup_wave_file()
+        if self.wave_file:
+            self._writer_thread = threading.Thread(
+                target=self._wave_writer_loop, name="wave-writer", daemon=True
+            )
+            self._writer_thread.start()
         self.stream = self.p_audio.open(
             format=AUDIO_FORMAT,
             channels=CHANNELS,
@@ -107,24 +218,100 @@ class MicrophoneProcessor:
             if self.stream.is_active():
                 self.stream.stop_stream()
             self.stream.close()
+        # 麦克风停止后再通知写入线程，确保最后的音频块也能被写入文件。
+        if self._writer_thread:
+            self._writer_stop.set()
+            self._writer_thread.join()
         self.p_audio.terminate()
+        for name, ring in (("网络发送", self.network_buffer), ("录音文件", self.file_buffer)):
+            if ring.dropped_bytes:
+                dropped_ms = ring.dropped_bytes // BYTES_PER_MS
+                logger.warning(
+                    f"{name}缓冲区已满，共丢弃 {ring.dropped_bytes} 字节音频 "
+                    f"(约 {dropped_ms} 毫秒)。"
+                )
         logger.info("麦克风已停止。")
 
 
-async def network_task(mic: MicrophoneProcessor, state: AppState, uri: str):
-    """处理WebSocket连接和数据发送。"""
+def network_buffer_capacity(batch_bytes: int, batch_ms: int) -> int:
+    """
+    根据合并发送的参数计算网络环形缓冲区的容量。
+
+    缓冲区至少要能容纳一条完整的消息，外加两个 `batch_ms` 窗口的音频，
+    这样在等待合并或发送稍有延迟时，实时回调也不会因缓冲区已满而丢弃音频。
+    """
+    return max(RING_BUFFER_CAPACITY, batch_bytes + 2 * batch_ms * BYTES_PER_MS)
+
+
+async def _send_batches(
+    websocket: websockets.ClientConnection, ring: ByteRingBuffer, batch_bytes: int, send_all: bool
+) -> int:
+    """
+    将环形缓冲区中的音频合并为不超过 `batch_bytes` 字节的消息发送。
+
+    默认只发送凑满 `batch_bytes` 的消息；`send_all` 为真时，不足一条的剩余数据也一并发出。
+
+    返回:
+        int: 本次发送的字节数。
+    """
+    sent = 0
+    while len(ring) >= batch_bytes or (send_all and len(ring)):
+        segments = ring.peek(batch_bytes)
+        # 直接发送环形缓冲区的视图：客户端帧在加掩码时本就会复制一次数据，
+        # 没有必要再预先复制成 bytes。只有数据环绕时才需要拼接。
+        batch = segments[0] if len(segments) == 1 else b"".join(segments)
+        # websockets 的类型标注只写了 str | bytes，但运行时接受任何 bytes-like 对象。
+        await websocket.send(batch)  # pyright: ignore[reportArgumentType]
+        # send 返回时帧已经序列化完毕，之后才允许生产者复用这部分空间。
+        ring.consume(len(batch))
+        sent += len(batch)
+    return sent
+
+
+async def network_task(
+    mic: MicrophoneProcessor, state: AppState, uri: str, batch_bytes: int, batch_ms: int
+):
+    """
+    处理WebSocket连接和数据发送。
+
+    多个音频块会被合并为一条消息发送，以减少帧和系统调用开销：累计达到 `batch_bytes`
+    字节时立即发送，否则自第一个待发送的音频块起最多等待 `batch_ms` 毫秒。
+    """
     state.status_text = f"正在连接到 {uri}..."
     try:
-        async with websockets.connect(uri) as websocket:
+        # 禁用 permessage-deflate：PCM 音频几乎无法被压缩，压缩只会白白消耗两端的 CPU。
+        async with websockets.connect(
+            uri,
+            compression=None,
+            max_size=None,
+            write_limit=WS_WRITE_LIMIT,
+        ) as websocket:
             state.status_text = "连接成功！正在实时传输音频..."
             logger.info("成功连接到 WebSocket 服务器")
 
-            while state.is_running:
-                try:
-                    chunk = await asyncio.wait_for(mic.network_queue.get(), timeout=0.1)
-                    await websocket.send(chunk)
-                except asyncio.TimeoutError:
+            loop = asyncio.get_running_loop()
+            poll_interval = min(batch_ms / 1000, NETWORK_POLL_INTERVAL)
+            batch_window = batch_ms / 1000
+            # 最早一个尚未发送的音频块被发现的时刻，缓冲区为空时为 None。
+            pending_since: float | None = None
+            shutting_down = False
+            while not shutting_down:
+                timeout = poll_interval
+                if pending_since is not None:
+                    # 有待发送的数据时，最迟在其等待时间到期时醒来。
+                    timeout = max(0.0, min(timeout, pending_since + batch_window - loop.time()))
+                shutting_down = await state.wait_for_shutdown(timeout)
+                if not len(mic.network_buffer):
+                    pending_since = None
                     continue
+                now = loop.time()
+                if pending_since is None:
+                    pending_since = now
+                # 等待超过 `batch_ms` 时不再凑满一条消息；收到关闭请求后，
+                # 也会把缓冲区中剩余的音频发送出去再退出。
+                send_all = shutting_down or now - pending_since >= batch_window
+                if await _send_batches(websocket, mic.network_buffer, batch_bytes, send_all):
+                    pending_since = now if len(mic.network_buffer) else None
     except ConnectionRefusedError:
         logger.error(f"无法连接到服务器 {uri}。请确认服务端正在运行。")
         state.status_text = "连接失败，请检查服务端状态。"
@@ -138,50 +325,43 @@ async def network_task(mic: MicrophoneProcessor, state: AppState, uri: str):
         logger.error(f"发生未知网络错误: {e}", exc_info=True)
         state.status_text = f"发生未知错误: {e}"
     finally:
-        state.is_running = False  # 确保其他任务可以正常退出
+        state.request_shutdown()  # 确保其他任务可以正常退出
         logger.info("网络任务结束。")
 
 
-async def save_audio_task(mic: MicrophoneProcessor, state: AppState):
-    """从队列中获取音频数据并将其写入WAV文件。"""
-    if not mic.wave_file:
-        return
-
-    logger.info("文件保存任务已启动。")
-    try:
-        while state.is_running:
-            try:
-                data = await asyncio.wait_for(mic.file_queue.get(), timeout=0.1)
-                mic.wave_file.writeframes(data)
-            except asyncio.TimeoutError:
-                continue
-    finally:
-        if mic.wave_file:
-            mic.wave_file.close()
-            logger.info(f"录音文件已成功保存和关闭: {mic.wave_filename}")
-
-
 async def tui_task(state: AppState):
-    """一个极简的、持续渲染状态和音量条的TUI循环。"""
-    bar_width = 40
-    sys.stdout.write("\n")
-    while state.is_running:
-        filled_len = int(bar_width * state.vu_level)
-        bar = "█" * filled_len + "-" * (bar_width - filled_len)
-        line = f"  状态: {state.status_text:<55} | 音量: [{bar}] {int(state.vu_level * 100):>3d}% "
-        sys.stdout.write(f"\r{line}")
-        sys.stdout.flush()
+    """一个极简的TUI循环，持续检查状态和音量，仅在显示内容变化时才重绘状态行。"""
+    # 先刷新文本层的缓冲，再直接向底层字节流写入，保证输出顺序。
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    out.write(b"\n")
+    last_frame = None
+    while True:
+        filled_len = min(int(TUI_BAR_WIDTH * state.vu_level), TUI_BAR_WIDTH)
+        percent = int(state.vu_level * 100)
+        frame = (state.status_text, filled_len, percent)
+        if frame != last_frame:
+            bar = TUI_BARS[filled_len]
+            line = f"\r  状态: {state.status_text:<55} | 音量: [{bar}] {percent:>3d}% "
+            out.write(line.encode("utf-8"))
+            out.flush()
+            last_frame = frame
         try:
-            await asyncio.sleep(0.1)
+            if await state.wait_for_shutdown(TUI_REFRESH_INTERVAL):
+                break
         except asyncio.CancelledError:
             break
-    sys.stdout.write("\n\n")
+    out.write(b"\n\n")
+    out.flush()
 
 
 async def amain(args):
     """应用的主异步函数，负责初始化和协调所有任务。"""
     state = AppState()
-    mic_processor = MicrophoneProcessor(state)
+    mic_processor = MicrophoneProcessor(
+        state, network_buffer_capacity(args.batch_bytes, args.batch_ms)
+    )
+    tasks: list[asyncio.Task] = []
 
     print("\n--- 🎤 小练语音助手客户端 ---")
     print("    正在启动... (按 Ctrl+C 退出)")
@@ -191,25 +371,37 @@ async def amain(args):
 
         uri = f"ws://{args.host}:{args.port}/audio"
 
-        all_tasks = asyncio.gather(
-            tui_task(state),
-            network_task(mic_processor, state, uri),
-            save_audio_task(mic_processor, state),
-        )
-        await all_tasks
+        tasks = [
+            asyncio.create_task(tui_task(state)),
+            asyncio.create_task(
+                network_task(mic_processor, state, uri, args.batch_bytes, args.batch_ms)
+            ),
+        ]
+        await asyncio.gather(*tasks)
 
     except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("捕获到中断信号 (Ctrl+C)。")
     finally:
         print("\n正在关闭...")
-        state.is_running = False
+        state.request_shutdown()
         if mic_processor:
             mic_processor.stop()
-        # 等待所有任务完成
-        await asyncio.sleep(0.5)
+        # 等待所有任务处理完关闭信号 (例如发送完剩余的音频) 并退出
+        await asyncio.gather(*tasks, return_exceptions=True)
         print("客户端已成功关闭。")
 
 
+def positive_int(value: str) -> int:
+    """argparse 的类型转换函数：只接受正整数。"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的整数: {value!r}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"必须为正整数: {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(description="小练语音助手命令行客户端")
     parser.add_argument("--host", type=str, default="localhost", help="服务器主机")
@@ -217,6 +409,18 @@ def main():
     parser.add_argument(
         "--client_id", type=str, default="default_user", help="用于标识客户端的唯一ID"
     )
+    parser.add_argument(
+        "--batch-bytes",
+        type=positive_int,
+        default=8192,
+        help="合并发送时每条 WebSocket 消息的最大字节数，累计达到后立即发送",
+    )
+    parser.add_argument(
+        "--batch-ms",
+        type=positive_int,
+        default=80,
+        help="合并发送时等待更多音频块的最长时间 (毫秒)",
+    )
     args = parser.parse_args()
 
     try:
@@ -0,0 +1,84 @@
+class ByteRingBuffer:
+    """
+    一个固定容量、单生产者/单消费者 (SPSC) 的字节环形缓冲区。
+
+    它用于在 PyAudio 的实时回调线程 (生产者) 与 asyncio 任务 (消费者) 之间传递音频数据。
+    生产者只推进写指针，消费者只推进读指针，且数据总是先写入、后发布指针，
+    因此两端无需加锁，也不需要通过 `call_soon_threadsafe` 唤醒事件循环。
+    底层存储在构造时一次性分配，推入数据时不会产生新的缓冲区。
+    """
+
+    def __init__(self, capacity: int):
+        """
+        参数:
+            capacity (int): 缓冲区的容量 (字节)。
+        """
+        if capacity <= 0:
+            raise ValueError("环形缓冲区的容量必须为正数。")
+        self._capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        # 读写指针都是单调递增的累计字节数，取模后才是实际的存储位置。
+        self._write_pos = 0
+        self._read_pos = 0
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        """返回当前可读取的字节数。"""
+        return self._write_pos - self._read_pos
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def push(self, data: bytes) -> bool:
+        """
+        由生产者调用，将数据写入缓冲区。
+
+        如果剩余空间不足以容纳整块数据，则丢弃该块 (累计到 `dropped_bytes`)，
+        以保证实时线程永远不会阻塞。
+
+        返回:
+            bool: 数据是否被成功写入。
+        """
+        size = len(data)
+        if size > self._capacity - (self._write_pos - self._read_pos):
+            self.dropped_bytes += size
+            return False
+
+        start = self._write_pos % self._capacity
+        end = start + size
+        if end <= self._capacity:
+            self._buffer[start:end] = data
+        else:
+            first = self._capacity - start
+            src = memoryview(data)
+            self._view[start:] = src[:first]
+            self._view[: size - first] = src[first:]
+        # 数据写入完成后再发布写指针，消费者才能看到这部分数据。
+        self._write_pos += size
+        return True
+
+    def peek(self, max_bytes: int) -> list[memoryview]:
+        """
+        由消费者调用，返回最多 `max_bytes` 字节可读数据的零拷贝视图，但不移除它们。
+
+        数据在存储区中发生环绕时会返回两段视图。在调用 `consume` 之前，
+        生产者不会覆盖这部分数据，因此视图保持有效。
+
+        返回:
+            list[memoryview]: 按顺序排列的数据视图；如果缓冲区为空，则返回空列表。
+        """
+        size = min(max_bytes, self._write_pos - self._read_pos)
+        if size <= 0:
+            return []
+
+        start = self._read_pos % self._capacity
+        end = start + size
+        if end <= self._capacity:
+            return [self._view[start:end]]
+        return [self._view[start:], self._view[: end - self._capacity]]
+
+    def consume(self, size: int):
+        """由消费者调用，在处理完 `peek` 返回的数据后，释放前 `size` 字节的空间。"""
+        self._read_pos += min(size, self._write_pos - self._read_pos)
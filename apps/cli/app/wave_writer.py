@@ -0,0 +1,106 @@
+import os
+import struct
+from collections.abc import Sequence
+
+# 标准 PCM WAV 文件头 (44 字节) 的布局
+WAVE_HEADER_FORMAT = "<4sI4s4sIHHIIHH4sI"
+WAVE_HEADER_SIZE = struct.calcsize(WAVE_HEADER_FORMAT)
+# 需要在关闭文件时回填的两个长度字段的偏移量
+RIFF_SIZE_OFFSET = 4
+DATA_SIZE_OFFSET = WAVE_HEADER_SIZE - 4
+
+
+def _pwrite(fd: int, data: bytes, offset: int):
+    """在指定偏移量处写入数据，不依赖也不改变当前的文件偏移量 (在支持的平台上)。"""
+    if hasattr(os, "pwrite"):
+        os.pwrite(fd, data, offset)
+    else:
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+class RawWaveWriter:
+    """
+    一个直接基于文件描述符的 PCM WAV 写入器。
+
+    与标准库的 `wave` 模块不同，它通过 `os.writev` 将多个缓冲区 (例如环形缓冲区的两段视图)
+    在一次系统调用中写入文件，且不需要先把它们拼接成一个新的字节串。
+    文件头在打开时写入占位的长度，关闭时再通过 `pwrite` 回填实际的长度。
+    """
+
+    def __init__(self, path: str, channels: int, sample_rate: int, sample_width: int):
+        """
+        参数:
+            path (str): 输出文件的路径。
+            channels (int): 声道数。
+            sample_rate (int): 采样率。
+            sample_width (int): 每个采样点的字节数。
+        """
+        # 注意：不能使用 O_APPEND。在 Linux 上，对以 O_APPEND 打开的文件调用 pwrite
+        # 会忽略偏移量而把数据追加到末尾，导致无法回填文件头。
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        flags |= getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+        self.path = path
+        self._fd: int | None = os.open(path, flags, 0o644)
+        self._data_bytes = 0
+
+        block_align = channels * sample_width
+        header = struct.pack(
+            WAVE_HEADER_FORMAT,
+            b"RIFF",
+            WAVE_HEADER_SIZE - 8,
+            b"WAVE",
+            b"fmt ",
+            16,  # fmt 块的大小
+            1,  # PCM 格式
+            channels,
+            sample_rate,
+            sample_rate * block_align,
+            block_align,
+            sample_width * 8,
+            b"data",
+            0,
+        )
+        try:
+            os.write(self._fd, header)
+        except OSError:
+            self.close()
+            raise
+
+    def write_segments(self, segments: Sequence[bytes | memoryview]):
+        """
+        将多个缓冲区按顺序写入文件。
+
+        参数:
+            segments: 需要写入的缓冲区，通常通过一次 `writev` 系统调用提交。
+        """
+        if self._fd is None:
+            raise ValueError("WAV 文件已关闭。")
+
+        total = sum(len(segment) for segment in segments)
+        if total == 0:
+            return
+        if hasattr(os, "writev"):
+            written = os.writev(self._fd, segments)
+        else:
+            written = 0
+        if written < total:
+            # 不支持 writev 的平台，或发生了部分写入 (极少见)：写入剩余部分。
+            remaining = memoryview(b"".join(segments))[written:]
+            while remaining:
+                remaining = remaining[os.write(self._fd, remaining) :]
+        self._data_bytes += total
+
+    def close(self):
+        """回填文件头中的长度字段并关闭文件。重复调用是安全的。"""
+        if self._fd is None:
+            return
+
+        fd, self._fd = self._fd, None
+        try:
+            if self._data_bytes:
+                riff_size = WAVE_HEADER_SIZE - 8 + self._data_bytes
+                _pwrite(fd, struct.pack("<I", riff_size), RIFF_SIZE_OFFSET)
+                _pwrite(fd, struct.pack("<I", self._data_bytes), DATA_SIZE_OFFSET)
+        finally:
+            os.close(fd)
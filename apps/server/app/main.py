@@ -67,6 +67,8 @@ async def lifespan(_: FastAPI):
     yield
 
     logger.info("应用关闭，清理资源...")
+    if app_state.tts_provider is not None:
+        await app_state.tts_provider.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -1,9 +1,14 @@
 import abc
 import asyncio
+import functools
 import os
+from collections.abc import AsyncGenerator
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Self
 
+import numpy as np
 import structlog
+import torch
 from funasr import AutoModel
 
 logger = structlog.get_logger(__name__)
@@ -51,17 +56,19 @@ class ASRStreamHandler(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    async def get_finalized_transcript(self) -> str | None:
+    async def transcripts(self) -> AsyncGenerator[str, None]:
         """
-        检查并返回一个已确认的最终转录片段（例如一个完整的句子）。
+        按顺序产生已确认的最终转录片段（例如一个完整的句子）。
 
-        此方法应为非阻塞的。如果自上次调用以来没有新的转录片段被确认，
-        它应返回 None 或空字符串。
+        这个方法应该是一个异步生成器：在没有新的转录片段时挂起等待，
+        而不是让调用方反复轮询；流结束 (退出上下文) 后生成器随之结束。
 
-        返回:
-            str | None: 如果有可用的最终转录文本，则返回该文本，否则返回 None。
+        产生 (Yields):
+            str: 最终转录文本。
         """
-        raise NotImplementedError
+        # 'yield' 语句是必需的，即使在抽象方法中也是如此，
+        # 以便解释器能将其接口识别为生成器函数。
+        yield ""
 
     async def __aenter__(self) -> Self:
         """进入上下文，返回自身。"""
@@ -78,28 +85,78 @@ class SenseVoiceStreamHandler(ASRStreamHandler):
     为 SenseVoice ASR 处理单个连续音频流的处理器。
     """
 
-    def __init__(self, model, language: str = "auto", use_itn: bool = True):
+    # 流式识别的基本块大小 (9600 字节 = 300ms 的 16kHz、16位单声道音频)
+    CHUNK_SIZE = 9600
+    # 已消费的前缀超过此大小时才真正从缓冲区中删除 (压缩)
+    COMPACT_THRESHOLD = 1 << 20
+    # 输入音频的采样格式：小端 16 位 PCM
+    PCM_DTYPE = np.dtype("<i2")
+    # 16位 PCM 转换为 [-1, 1) 区间浮点数的缩放系数
+    INT16_SCALE = 1.0 / 32768.0
+
+    def __init__(
+        self,
+        model,
+        executor: Executor,
+        language: str = "auto",
+        use_itn: bool = True,
+        chunks_per_call: int = 3,
+    ):
+        """
+        参数:
+            model: 已加载的 SenseVoice 模型。
+            executor (Executor): 执行模型推理的执行器。
+            language (str): 识别语言。
+            use_itn (bool): 是否启用逆文本标准化。
+            chunks_per_call (int): 每次调用 `generate` 时合并的基本块数量。
+                                   合并调用可以摊薄模型每次调用的固定开销。
+        """
         self._model = model
+        self._executor = executor
         self._language = language
         self._use_itn = use_itn
+        self._batch_size = self.CHUNK_SIZE * max(1, chunks_per_call)
         self._cache = {}
+        # 缓冲区配合读指针 `_head` 使用：已处理的数据只推进指针，定期再统一压缩。
         self._buffer = bytearray()
-        self._finalized_transcript = None
+        self._head = 0
+        # 已确认的最终转录，None 表示流已结束。
+        self._transcripts: asyncio.Queue[str | None] = asyncio.Queue()
         self.logger = logger.bind(stream_id=id(self))
 
-    def _process_buffer(self, is_final: bool = False):
+    def _process_buffer(self, is_final: bool = False) -> str | None:
         """
         用于处理内部音频缓冲区的同步方法。
+
+        返回:
+            str | None: 本次处理中确认的最终转录文本，如果没有则返回 None。
         """
-        chunk_size = 9600
-        while len(self._buffer) >= chunk_size or (is_final and len(self._buffer) > 0):
-            chunk_to_process = self._buffer[:chunk_size]
-            self._buffer = self._buffer[chunk_size:]
-            final_flag_for_chunk = is_final and len(self._buffer) == 0
+        finalized_transcript = None
+        batch_size = self._batch_size
+        sample_width = self.PCM_DTYPE.itemsize
+        buffer = self._buffer
+        while True:
+            # 只处理完整的采样点；流结束时残留的半个采样点会被丢弃。
+            available = len(buffer) - self._head
+            available -= available % sample_width
+            if available < batch_size and not (is_final and available > 0):
+                break
+            size = min(batch_size, available)
+            # 直接从缓冲区解码为模型需要的 float32 波形，既不复制出中间的 bytes，
+            # 也让 FunASR 跳过它自己对字节输入的解码。剩余数据保持原地不动。
+            samples = np.frombuffer(
+                buffer, dtype=self.PCM_DTYPE, count=size // sample_width, offset=self._head
+            )
+            chunk_to_process = np.multiply(samples, self.INT16_SCALE, dtype=np.float32)
+            # 释放对缓冲区的引用，否则缓冲区之后无法改变大小。
+            del samples
+            end = self._head + size
+            self._head = end
+            final_flag_for_chunk = is_final and len(buffer) - end < sample_width
 
             try:
                 result = self._model.generate(
-                    input=bytes(chunk_to_process),
+                    input=chunk_to_process,
                     cache=self._cache,
                     language=self._language,
                     use_itn=self._use_itn,
@@ -107,28 +164,50 @@ class SenseVoiceStreamHandler(ASRStreamHandler):
                 )
                 if result and isinstance(result, list) and "text" in result[0]:
                     if final_flag_for_chunk:
-                        self._finalized_transcript = result[0]["text"]
+                        finalized_transcript = result[0]["text"]
             except Exception as e:
                 self.logger.error("ASR 模型 generate 失败", exc_info=e)
                 break
 
+        self._compact_buffer()
+        return finalized_transcript
+
+    def _compact_buffer(self):
+        """当缓冲区已被全部消费，或已消费的前缀足够大时，删除已处理的数据。"""
+        if self._head == len(self._buffer):
+            self._buffer.clear()
+            self._head = 0
+        elif self._head >= self.COMPACT_THRESHOLD:
+            del self._buffer[: self._head]
+            self._head = 0
+
+    async def _run_in_executor(self, is_final: bool):
+        """在模型专用的执行器中处理缓冲区，并在事件循环中发布确认的最终转录。"""
+        loop = asyncio.get_running_loop()
+        transcript = await loop.run_in_executor(
+            self._executor, functools.partial(self._process_buffer, is_final=is_final)
+        )
+        if transcript:
+            self._transcripts.put_nowait(transcript)
+
     async def feed_audio(self, audio_chunk: bytes):
         """将音频附加到缓冲区并分块处理。"""
         self._buffer.extend(audio_chunk)
-        await asyncio.to_thread(self._process_buffer, is_final=False)
+        await self._run_in_executor(is_final=False)
 
-    async def get_finalized_transcript(self) -> str | None:
-        """如果最终转录可用，则返回它。"""
-        if self._finalized_transcript:
-            transcript = self._finalized_transcript
-            self._finalized_transcript = None
-            return transcript
-        return None
+    async def transcripts(self) -> AsyncGenerator[str, None]:
+        """等待并产生每一个最终转录，直到流结束。"""
+        while (transcript := await self._transcripts.get()) is not None:
+            yield transcript
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """将缓冲区中任何剩余的音频作为最后一段进行处理。"""
         self.logger.info("ASR 流正在结束，处理剩余音频。")
-        await asyncio.to_thread(self._process_buffer, is_final=True)
+        try:
+            await self._run_in_executor(is_final=True)
+        finally:
+            # 通知 `transcripts` 的使用者流已结束。
+            self._transcripts.put_nowait(None)
 
 
 class SenseVoiceASRProvider(ASRProvider):
@@ -137,14 +216,21 @@ class SenseVoiceASRProvider(ASRProvider):
     """
 
     _model = None
+    # 所有流共享同一个模型，推理统一在这个单线程执行器中串行进行。
+    _shared_executor: ThreadPoolExecutor | None = None
 
     def __init__(
         self,
         device: str = "cpu",
+        chunks_per_call: int = 3,
         **kwargs,
     ):
         """
         初始化并加载 SenseVoice 流式模型。
+
+        参数:
+            device (str): 运行模型的设备。
+            chunks_per_call (int): 每个转录流在单次 `generate` 调用中合并的 300ms 音频块数量。
         """
         # 从环境变量读取模型目录的路径
         models_dir_path = os.getenv("MODELS_DIR_PATH")
@@ -162,25 +248,75 @@ class SenseVoiceASRProvider(ASRProvider):
         if SenseVoiceASRProvider._model is None:
             log.info("正在初始化 SenseVoice ASR 提供程序")
             try:
-                SenseVoiceASRProvider._model = AutoModel(
+                model = AutoModel(
                     model=model_path,
                     device=device,
                     disable_update=True,
                     frontend_conf={"is_final": False},
                     **kwargs,
                 )
+                executor = self._create_executor(device)
+                try:
+                    self._warmup(model, executor, chunks_per_call)
+                except BaseException:
+                    # 预热失败时模型不会被发布，关闭刚刚创建的执行器，避免其线程泄漏。
+                    executor.shutdown(wait=False)
+                    raise
                 log.info("SenseVoice ASR 模型加载成功")
             except Exception as e:
                 log.error("加载 SenseVoice 模型失败", exc_info=e)
                 raise
+            SenseVoiceASRProvider._model = model
+            SenseVoiceASRProvider._shared_executor = executor
         else:
             log.info("SenseVoice ASR 模型已经加载，跳过初始化")
 
+        # 模型与执行器总是一同初始化，这里向 Pyright 保证执行器已经存在。
+        assert SenseVoiceASRProvider._shared_executor is not None
         self._model = SenseVoiceASRProvider._model
+        self._executor = SenseVoiceASRProvider._shared_executor
+        self._chunks_per_call = chunks_per_call
+
+    @staticmethod
+    def _create_executor(device: str) -> ThreadPoolExecutor:
+        """
+        创建执行模型推理的单线程执行器。
+
+        推理是计算密集型的，且所有流共享同一个模型实例：在默认线程池的多个线程中并发调用
+        只会互相争抢 GIL 和 CUDA 上下文，因此改为由一个专用线程串行执行。
+        使用 CUDA 时，该线程在启动时绑定到模型所在的设备。
+        """
+        initializer = None
+        torch_device = torch.device(device)
+        if torch_device.type == "cuda":
+            initializer = functools.partial(torch.cuda.set_device, torch_device.index or 0)
+        return ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sensevoice", initializer=initializer
+        )
+
+    @staticmethod
+    def _warmup(model, executor: Executor, chunks_per_call: int):
+        """
+        在推理线程中用一段静音执行一次完整的推理，提前完成算子的初始化和内核选择，
+        避免第一个真实请求承担这部分延迟。静音的长度与流式处理时单次调用的输入一致。
+        """
+        batch_size = SenseVoiceStreamHandler.CHUNK_SIZE * max(1, chunks_per_call)
+        num_samples = batch_size // SenseVoiceStreamHandler.PCM_DTYPE.itemsize
+        silence = np.zeros(num_samples, dtype=np.float32)
+        executor.submit(
+            model.generate,
+            input=silence,
+            cache={},
+            language="auto",
+            use_itn=True,
+            is_final=True,
+        ).result()
 
     def stream_transcribe(self) -> SenseVoiceStreamHandler:
         """
         为转录会话创建一个新的流处理器。
         """
         logger.info("正在开始新的 ASR 转录流")
-        return SenseVoiceStreamHandler(self._model)
+        return SenseVoiceStreamHandler(
+            self._model, self._executor, chunks_per_call=self._chunks_per_call
+        )
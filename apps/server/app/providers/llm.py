@@ -1,11 +1,18 @@
 import abc
 import os
+from collections.abc import AsyncGenerator
 
+import httpx
 import structlog
-from openai import AsyncOpenAI, OpenAIError
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAIError
 
 logger = structlog.get_logger(__name__)
 
+# 与 LLM 服务之间的 HTTP 连接池配置。所有请求复用同一个支持 HTTP/2 的客户端，
+# 并发的对话可以在同一条连接上多路复用，而不必为每个请求重新建立 TCP/TLS 连接。
+LLM_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+LLM_HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
 
 class LLMProvider(abc.ABC):
     """
@@ -22,10 +29,29 @@ class LLMProvider(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
+    async def chat_stream(self, text: str) -> AsyncGenerator[str, None]:
+        """
+        向LLM发送文本查询，并以流的形式返回响应。
+
+        这个方法应该是一个异步生成器，模型每生成一段文本就立即产生它，
+        使调用方可以在完整的回复生成之前就开始后续处理（例如语音合成）。
+
+        参数:
+            text (str): 要发送给模型的用户输入文本。
+
+        产生 (Yields):
+            str: LLM 响应的增量文本片段。
+        """
+        # 'yield' 语句是必需的，即使在抽象方法中也是如此，
+        # 以便解释器能将其接口识别为生成器函数。
+        yield ""
+
     async def chat(self, text: str) -> str:
         """
         向LLM发送文本查询并获取响应。
 
+        默认实现会收集 `chat_stream` 产生的所有片段。
+
         参数:
             text (str): 要发送给模型的用户输入文本。
 
@@ -33,7 +59,7 @@ class LLMProvider(abc.ABC):
             str: 包含LLM响应的字符串。
                  此方法应等待完整的响应返回。
         """
-        raise NotImplementedError
+        return "".join([delta async for delta in self.chat_stream(text)]).strip()
 
 
 class OpenAILLMProvider(LLMProvider):
@@ -73,26 +99,32 @@ class OpenAILLMProvider(LLMProvider):
             # 为了让 `openai` 库在连接本地服务时不报错，可以传递一个非空的假密钥
             final_api_key = "no-key-provided"
 
-        # 初始化异步的OpenAI客户端
+        # 初始化异步的OpenAI客户端，并使用一个持久的 HTTP/2 连接池
         self._client = AsyncOpenAI(
             api_key=final_api_key,
             base_url=final_base_url,
+            http_client=DefaultAsyncHttpxClient(
+                http2=True,
+                limits=LLM_HTTP_LIMITS,
+                timeout=LLM_HTTP_TIMEOUT,
+            ),
         )
         self._model = model
         self._system_prompt = system_prompt
 
-    async def chat(self, text: str) -> str:
+    async def chat_stream(self, text: str) -> AsyncGenerator[str, None]:
         """
-        向OpenAI兼容的API发送聊天请求。
+        以流式方式向OpenAI兼容的API发送聊天请求。
 
         参数:
             text (str): 用户的输入。
 
-        返回:
-            str: LLM生成的回复文本。如果发生错误或输入为空，则返回错误信息或空字符串。
+        产生 (Yields):
+            str: LLM 生成的增量文本。如果发生错误，则产生一段错误信息；
+                 如果输入为空，则不产生任何内容。
         """
         if not text:
-            return ""
+            return
 
         log = logger.bind(text=text[:50] + "...")
         log.info("正在向LLM发送文本")
@@ -103,22 +135,30 @@ class OpenAILLMProvider(LLMProvider):
                 {"role": "user", "content": text},
             ]
 
-            # 发起异步API调用
-            response = await self._client.chat.completions.create(
+            # 发起流式的异步API调用
+            stream = await self._client.chat.completions.create(
                 model=self._model,
                 messages=messages,
+                stream=True,
             )
 
-            # 从返回结果中提取文本内容
-            content = response.choices[0].message.content or ""
-            log.info("从LLM接收到回复", response=content[:50] + "...")
-            return content.strip()
+            # 从每个事件中提取增量文本内容。
+            # 使用 `async with` 确保在调用方提前停止 (例如被打断而取消) 时也会关闭响应，
+            # 释放连接并让服务端停止继续生成。
+            async with stream:
+                async for event in stream:
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        yield delta
+            log.info("LLM流式回复接收完毕")
 
         except OpenAIError as e:
             # 捕获并记录所有来自openai库的API错误
             log.error("OpenAI API 调用出错", exc_info=e)
-            return f"抱歉，调用语言模型时遇到了一个错误：{e}"
+            yield f"抱歉，调用语言模型时遇到了一个错误：{e}"
         except Exception as e:
             # 捕获其他未知异常
             log.error("处理LLM响应时发生未知错误", exc_info=e)
-            return "抱歉，处理您的请求时遇到了一个未知错误。"
+            yield "抱歉，处理您的请求时遇到了一个未知错误。"
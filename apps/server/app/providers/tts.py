@@ -1,11 +1,15 @@
 import abc
 from collections.abc import AsyncGenerator
 
+import aiohttp
 import edge_tts
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# 共享连接器缓存 DNS 解析结果的时间 (秒)
+EDGE_TTS_DNS_CACHE_TTL = 300
+
 
 class TTSProvider(abc.ABC):
     """
@@ -39,6 +43,27 @@ class TTSProvider(abc.ABC):
         # 以便解释器能将其接口识别为生成器函数。
         yield b""
 
+    async def aclose(self):
+        """释放提供程序持有的网络资源。默认实现不需要做任何事情。"""
+        return None
+
+
+class _SharedTCPConnector(aiohttp.TCPConnector):
+    """
+    可以被多个短生命周期的 `aiohttp.ClientSession` 共享的连接器。
+
+    edge-tts 为每次合成创建一个新的 ClientSession，并在结束时关闭传入的连接器。
+    这里让 `close` 成为空操作，使连接器 (及其 DNS 缓存) 能跨多次合成复用，
+    真正的关闭由 `shutdown` 完成。
+    """
+
+    async def close(self, *, abort_ssl: bool = False) -> None:
+        return None
+
+    async def shutdown(self):
+        """真正关闭连接器及其持有的所有连接。"""
+        await super().close()
+
 
 class EdgeTTSProvider(TTSProvider):
     """
@@ -66,6 +91,20 @@ class EdgeTTSProvider(TTSProvider):
         self._volume = volume
         # edge-tts 本身是轻量级的，不需要在初始化时加载重模型，
         # 真正的通信发生在调用 stream 方法时。
+        # 连接器必须在事件循环中创建，因此在第一次合成时才初始化。
+        self._connector: _SharedTCPConnector | None = None
+
+    def _get_connector(self) -> _SharedTCPConnector:
+        """返回在所有合成请求之间共享的连接器，必要时创建它。"""
+        if self._connector is None or self._connector.closed:
+            self._connector = _SharedTCPConnector(ttl_dns_cache=EDGE_TTS_DNS_CACHE_TTL)
+        return self._connector
+
+    async def aclose(self):
+        """关闭共享的连接器。"""
+        if self._connector is not None:
+            await self._connector.shutdown()
+            self._connector = None
 
     async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
         """
@@ -86,7 +125,11 @@ class EdgeTTSProvider(TTSProvider):
         try:
             # 创建 Communicate 对象，这是 edge-tts 的核心
             communicate = edge_tts.Communicate(
-                text, self._voice, rate=self._rate, volume=self._volume
+                text,
+                self._voice,
+                rate=self._rate,
+                volume=self._volume,
+                connector=self._get_connector(),
             )
 
             # communicate.stream() 本身就是一个异步生成器
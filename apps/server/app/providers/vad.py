@@ -1,5 +1,6 @@
 import abc
 import os
+from collections.abc import Sequence
 from typing import Literal
 
 import numpy as np
@@ -24,19 +25,35 @@ class VADProvider(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def is_speech(self, audio_chunk: bytes) -> bool:
+    def is_speech(self, audio_chunk: bytes | memoryview) -> bool:
         """
         分析一个音频块，以确定它是否包含语音。
 
         参数:
-            audio_chunk (bytes): 包含原始音频数据的字节对象。
+            audio_chunk (bytes | memoryview): 包含原始音频数据的字节对象或内存视图。
                                  具体的实现应处理特定的音频格式（如采样率、通道数）。
+                                 实现不应在调用返回后继续持有内存视图。
 
         返回:
             bool: 如果检测到语音，则为 True，否则为 False。
         """
         raise NotImplementedError
 
+    def is_speech_batch(self, audio_chunks: Sequence[bytes | memoryview]) -> list[bool]:
+        """
+        依次分析一组在时间上连续的音频块，返回每个块是否包含语音。
+
+        默认实现逐块调用 `is_speech`。具体的实现可以覆盖此方法，
+        以便在一次调用中完成整批数据的预处理，摊薄每次调用的固定开销。
+
+        参数:
+            audio_chunks (Sequence[bytes | memoryview]): 按时间顺序排列的原始音频块。
+
+        返回:
+            list[bool]: 与输入一一对应的检测结果。
+        """
+        return [self.is_speech(chunk) for chunk in audio_chunks]
+
 
 class SileroVADProvider(VADProvider):
     """
@@ -46,6 +63,15 @@ class SileroVADProvider(VADProvider):
     它假定输入的音频是 16kHz、16位单声道的 PCM 格式。
     """
 
+    # 输入音频的采样格式：小端 16 位 PCM。显式指定字节序，使大端平台上的解析结果同样正确。
+    PCM_DTYPE = np.dtype("<i2")
+    # 16位 PCM 转换为 [-1, 1) 区间浮点数的缩放系数
+    INT16_SCALE = 1.0 / 32768.0
+    # 预分配的转换缓冲区的初始大小 (采样点)，覆盖 Silero 支持的最大块大小
+    MAX_CHUNK_SAMPLES = 1536
+    # 预热推理使用的块大小 (采样点)，与流水线实际送入的块大小一致
+    WARMUP_CHUNK_SAMPLES = 512
+
     _model: torch.jit.ScriptModule
     _threshold: float
 
@@ -90,19 +116,67 @@ class SileroVADProvider(VADProvider):
                 force_reload=False,
             )
             self._model.to(device)
+            self._device = torch.device(device)
             self._threshold = threshold
+            self._allocate_input_buffer(self.MAX_CHUNK_SAMPLES)
+            self._warmup()
             self._model.reset_states()
             log.info("Silero VAD 模型加载成功")
         except Exception as e:
             log.error("加载 Silero VAD 模型失败", exc_info=e)
             raise
 
-    def is_speech(self, audio_chunk: bytes) -> bool:
+    def _warmup(self):
+        """
+        用一段静音执行一次推理，提前触发 TorchScript 的图优化和特化，
+        避免第一个真实请求承担这部分延迟。调用方随后需要重置模型状态。
+        """
+        silence = torch.zeros(self.WARMUP_CHUNK_SAMPLES, device=self._device)
+        with torch.inference_mode():
+            self._model(silence, 16000)
+
+    def _allocate_input_buffer(self, num_samples: int):
+        """分配可复用的 float32 输入缓冲区，numpy 数组与 CPU 张量共享同一块内存。"""
+        self._input_array = np.empty(num_samples, dtype=np.float32)
+        self._input_tensor = torch.from_numpy(self._input_array)
+
+    def _to_tensors(self, audio_chunks: Sequence[bytes | memoryview]) -> list[torch.Tensor]:
+        """
+        将一组 16 位 PCM 字节块转换并缩放到同一个预分配的 float32 缓冲区中，
+        避免每次调用分配临时数组。返回与每个输入块对应的张量视图。
+
+        `np.frombuffer` 直接引用输入的内存 (包括内存视图)，不会复制数据。
+        """
+        arrays = [np.frombuffer(chunk, dtype=self.PCM_DTYPE) for chunk in audio_chunks]
+        total_samples = sum(array.size for array in arrays)
+        if total_samples > self._input_array.size:
+            self._allocate_input_buffer(total_samples)
+
+        bounds = []
+        offset = 0
+        for array in arrays:
+            end = offset + array.size
+            np.multiply(
+                array,
+                self.INT16_SCALE,
+                out=self._input_array[offset:end],
+                dtype=np.float32,
+            )
+            bounds.append((offset, end))
+            offset = end
+
+        audio_tensor = self._input_tensor[:total_samples]
+        if self._device.type != "cpu":
+            # 整批数据只需一次拷贝到目标设备
+            audio_tensor = audio_tensor.to(self._device, non_blocking=True)
+        return [audio_tensor[start:end] for start, end in bounds]
+
+    def is_speech(self, audio_chunk: bytes | memoryview) -> bool:
         """
         在原始的 16kHz、16位单声道 PCM 音频块中检测语音。
 
         参数:
-            audio_chunk: 原始 PCM 数据的字节。为了获得最佳结果，块大小
+            audio_chunk: 原始 PCM 数据的字节或内存视图。为了获得最佳结果，块大小
                          应为 [256, 512, 768, 1024, 1536] 个采样点之一。
 
         返回:
@@ -112,14 +186,40 @@ class SileroVADProvider(VADProvider):
             return False
 
         try:
-            audio_int16 = np.frombuffer(audio_chunk, dtype=np.int16)
-            audio_float32 = audio_int16.astype(np.float32) / 32768.0
-            audio_tensor = torch.from_numpy(audio_float32)
+            audio_tensor = self._to_tensors([audio_chunk])[0]
 
-            with torch.no_grad():
+            with torch.inference_mode():
                 speech_prob = self._model(audio_tensor, 16000).item()
 
             return speech_prob >= self._threshold
         except Exception as e:
             logger.error("VAD 处理时发生错误", exc_info=e)
             return False
+
+    def is_speech_batch(self, audio_chunks: Sequence[bytes | memoryview]) -> list[bool]:
+        """
+        对一组在时间上连续的音频块进行语音检测。
+
+        整批数据只做一次预处理，并在同一个推理上下文中完成，概率阈值也以向量化的方式比较。
+        注意：Silero 在批量输入 `(B, N)` 时会把每一行当作一路独立的音频流，
+        而这些块是同一路音频的连续片段，依赖模型内部的状态，因此模型仍按时间顺序逐块调用。
+
+        参数:
+            audio_chunks: 按时间顺序排列的原始 PCM 数据块。
+
+        返回:
+            与输入一一对应的检测结果。
+        """
+        if not audio_chunks:
+            return []
+
+        try:
+            audio_tensors = self._to_tensors(audio_chunks)
+            with torch.inference_mode():
+                speech_probs = torch.cat(
+                    [self._model(tensor, 16000).flatten() for tensor in audio_tensors]
+                )
+            return (speech_probs >= self._threshold).tolist()
+        except Exception as e:
+            logger.error("VAD 批量处理时发生错误", exc_info=e)
+            return [False] * len(audio_chunks)
@@ -1,7 +1,11 @@
 import asyncio
+import json
+import re
+from collections.abc import AsyncGenerator, AsyncIterable
+from contextlib import aclosing, suppress
 
 import structlog
-from app.providers.asr import ASRProvider
+from app.providers.asr import ASRProvider, ASRStreamHandler
 from app.providers.llm import LLMProvider
 from app.providers.tts import TTSProvider
 from app.providers.vad import VADProvider
@@ -10,6 +14,45 @@ from fastapi import WebSocket, WebSocketDisconnect
 # 获取一个模块级别的日志记录器
 logger = structlog.get_logger(__name__)
 
+# 句子结束的标志：中英文的句号、问号、叹号、分号，换行，以及后接空白的英文句点。
+SENTENCE_END_PATTERN = re.compile(r"[。！？；!?;\n]|\.(?=\s)")
+# 合并发送 TTS 音频的目标大小 (字节)。每段语音的第一个块会立即发送，以免增加首段音频的延迟。
+TTS_SEND_BUFFER_SIZE = 8 * 1024
+# 播放队列最多积压的音频消息数。TTS 领先于发送的部分受此限制，打断时需要丢弃的数据也就很少。
+PLAYBACK_QUEUE_MAXSIZE = 4
+# 打断时发送给客户端的控制消息 (文本帧)，通知客户端立即停止并清空已缓冲的音频。
+PLAYBACK_FLUSH_MESSAGE = json.dumps({"type": "flush"})
+# 接收队列最多积压的消息数。队列满时接收任务暂停读取，由 TCP 向客户端施加背压。
+AUDIO_QUEUE_MAXSIZE = 64
+
+
+async def split_sentences(text_stream: AsyncIterable[str]) -> AsyncGenerator[str, None]:
+    """
+    将增量的文本流切分为完整的句子。
+
+    每当累积的文本中出现句子结束标志时，就立即产生结束标志之前（含）的全部内容，
+    流结束时再产生剩余的文本。
+
+    参数:
+        text_stream: 产生增量文本片段的异步可迭代对象。
+
+    产生 (Yields):
+        str: 去除首尾空白后的非空句子。
+    """
+    pending = ""
+    async for delta in text_stream:
+        pending += delta
+        matches = list(SENTENCE_END_PATTERN.finditer(pending))
+        if not matches:
+            continue
+        cut = matches[-1].end()
+        sentence, pending = pending[:cut], pending[cut:]
+        if sentence := sentence.strip():
+            yield sentence
+
+    if pending := pending.strip():
+        yield pending
+
 
 class VoicePipeline:
     """
@@ -46,6 +89,12 @@ class VoicePipeline:
         self.active_llm_task: asyncio.Task | None = None
         # 为 VAD 创建一个内部缓冲区，以处理任意大小的输入音频流。
         self._vad_buffer = bytearray()
+        # 待发送给客户端的 TTS 音频 (bytes) 和控制消息 (str)，由发送任务按顺序发出。
+        self._playback_queue: asyncio.Queue[bytes | str] = asyncio.Queue(PLAYBACK_QUEUE_MAXSIZE)
+        # 自上次通知客户端清空以来，是否发送过音频。
+        self._playback_dirty = False
+        # 连接是否已经结束。结束后确认的转录无法再回复给客户端。
+        self._closing = False
 
     async def run(self, websocket: WebSocket):
         """
@@ -54,65 +103,199 @@ class VoicePipeline:
         参数:
             websocket: 客户端的 WebSocket 连接实例。
         """
-        async with self.asr.stream_transcribe() as asr_stream:
-            try:
-                async for audio_chunk in websocket.iter_bytes():
-                    # 1. 将音频块同时喂给 ASR 流处理器。
-                    #    ASR 处理器有自己的内部缓冲和逻辑。
-                    await asr_stream.feed_audio(audio_chunk)
-
-                    # 2. 处理 VAD 的缓冲和分块逻辑。
-                    #    将传入的音频块追加到 VAD 缓冲区。
-                    self._vad_buffer.extend(audio_chunk)
-
-                    # 当缓冲区中的数据足够进行一次 VAD 推理时，循环处理。
-                    while len(self._vad_buffer) >= self.VAD_CHUNK_SIZE:
-                        # 从缓冲区前端切出一个 VAD 模型期望大小的块。
-                        vad_chunk = self._vad_buffer[: self.VAD_CHUNK_SIZE]
-                        self._vad_buffer = self._vad_buffer[self.VAD_CHUNK_SIZE :]
-
-                        # [核心修复] 将 bytearray 显式转换为 bytes 以满足类型检查。
-                        if self.vad.is_speech(bytes(vad_chunk)):
+        transcript_task: asyncio.Task | None = None
+        try:
+            async with self.asr.stream_transcribe() as asr_stream:
+                audio_queue: asyncio.Queue[bytes | None] = asyncio.Queue(AUDIO_QUEUE_MAXSIZE)
+                receiver_task = asyncio.create_task(self._receive_audio(websocket, audio_queue))
+                # 转录结果由单独的任务等待，接收循环不再需要每次都去查询 ASR。
+                transcript_task = asyncio.create_task(self._consume_transcripts(asr_stream))
+                playback_task = asyncio.create_task(self._send_playback(websocket))
+                # 循环中每次都要用到的方法预先绑定为局部变量，省去重复的属性查找。
+                next_audio_batch = self._next_audio_batch
+                detect_speech = self._detect_speech
+                feed_audio = asr_stream.feed_audio
+                try:
+                    # 每次取出队列中已到达的全部音频，合并为一块处理。
+                    while (audio_chunk := await next_audio_batch(audio_queue)) is not None:
+                        # 1. 将音频块同时喂给 ASR 流处理器。
+                        #    ASR 处理器有自己的内部缓冲和逻辑。
+                        await feed_audio(audio_chunk)
+
+                        # 2. 处理 VAD 的缓冲和分块逻辑，取出所有完整的块，整批交给 VAD。
+                        if detect_speech(audio_chunk):
                             # 实现“打断”(Barge-in)功能。
-                            if self.active_llm_task and not self.active_llm_task.done():
-                                logger.info("检测到用户说话，正在打断当前的TTS播放...")
-                                self.active_llm_task.cancel()
-                                self.active_llm_task = None
-
-                    # 3. 检查 ASR 是否已经识别出了一段完整的句子。
-                    transcript = await asr_stream.get_finalized_transcript()
-                    if transcript:
-                        logger.info("ASR识别到完整句子", transcript=transcript)
-
-                        # 4. 创建后台任务来处理 LLM 和 TTS，不阻塞主循环。
-                        self.active_llm_task = asyncio.create_task(
-                            self._process_llm_and_tts(transcript, websocket)
-                        )
-
-            except WebSocketDisconnect:
-                logger.info("客户端断开连接。")
-            except Exception as e:
-                logger.error("处理语音流时发生未知错误", exc_info=e)
-            finally:
-                # 5. 清理工作：如果连接关闭时仍有正在运行的任务，取消它。
-                if self.active_llm_task and not self.active_llm_task.done():
-                    self.active_llm_task.cancel()
-                logger.info("语音流水线会话结束。")
-
-    async def _process_llm_and_tts(self, text: str, websocket: WebSocket):
-        """
-        后台任务：调用 LLM 获取回复，然后流式传输 TTS 音频回客户端。
+                            self._interrupt_playback()
+
+                    # 接收结束后，取得接收任务的结果，使其中的异常能在这里被处理。
+                    await receiver_task
+
+                except WebSocketDisconnect:
+                    logger.info("客户端断开连接。")
+                except Exception as e:
+                    logger.error("处理语音流时发生未知错误", exc_info=e)
+                finally:
+                    # 3. 清理工作：如果连接关闭时仍有正在运行的任务，取消它。
+                    self._closing = True
+                    helper_tasks = (receiver_task, playback_task)
+                    for task in helper_tasks:
+                        task.cancel()
+                    if self.active_llm_task and not self.active_llm_task.done():
+                        self.active_llm_task.cancel()
+                    # 等待后台任务真正结束，并取得它们的结果，避免出现未被取得的异常。
+                    await asyncio.gather(*helper_tasks, return_exceptions=True)
+        finally:
+            # 退出 ASR 上下文时会处理剩余的音频并放入结束标志，转录任务读完最后的转录后自行结束。
+            if transcript_task is not None:
+                await asyncio.gather(transcript_task, return_exceptions=True)
+            logger.info("语音流水线会话结束。")
+
+    def _interrupt_playback(self):
+        """
+        用户开始说话时打断当前的回复：取消 LLM/TTS 任务，丢弃尚未发送的音频，
+        并通知客户端清空它已经缓冲的音频。如果没有正在进行或刚刚播放过的回复，则什么也不做。
+        """
+        llm_task_running = self.active_llm_task is not None and not self.active_llm_task.done()
+        if not (llm_task_running or self._playback_dirty or not self._playback_queue.empty()):
+            return
+
+        logger.info("检测到用户说话，正在打断当前的TTS播放...")
+        if self.active_llm_task is not None:
+            self.active_llm_task.cancel()
+            self.active_llm_task = None
+        while not self._playback_queue.empty():
+            self._playback_queue.get_nowait()
+        # 队列刚刚被清空，一定有空位。
+        self._playback_queue.put_nowait(PLAYBACK_FLUSH_MESSAGE)
+        self._playback_dirty = False
+
+    async def _send_playback(self, websocket: WebSocket):
+        """
+        后台任务：按顺序把播放队列中的音频和控制消息发送给客户端。
 
         参数:
-            text (str): ASR 识别出的文本。
             websocket: 客户端的 WebSocket 连接实例。
         """
         try:
-            llm_response = await self.llm.chat(text)
-            tts_stream = self.tts.stream(llm_response)
+            while True:
+                message = await self._playback_queue.get()
+                if isinstance(message, str):
+                    await websocket.send_text(message)
+                else:
+                    self._playback_dirty = True
+                    await websocket.send_bytes(message)
+        except Exception as e:
+            logger.error("向客户端发送音频时发生错误", exc_info=e)
+            # 发送任务停止后播放队列不会再被消费，取消正在生成回复的任务，避免它在满队列上永远等待。
+            if self.active_llm_task and not self.active_llm_task.done():
+                self.active_llm_task.cancel()
+
+    async def _consume_transcripts(self, asr_stream: ASRStreamHandler):
+        """
+        后台任务：等待 ASR 确认的每一段完整句子，并为它启动 LLM 和 TTS 的处理。
 
-            async for tts_chunk in tts_stream:
-                await websocket.send_bytes(tts_chunk)
+        任务一直运行到 ASR 流结束：连接关闭后 ASR 流才会处理剩余的音频，
+        这时确认的最后一段转录只记录日志，不再启动无法送达客户端的回复。
+
+        参数:
+            asr_stream: 当前会话的 ASR 流处理器。
+        """
+        async for transcript in asr_stream.transcripts():
+            logger.info("ASR识别到完整句子", transcript=transcript)
+            if self._closing:
+                continue
+
+            # 创建后台任务来处理 LLM 和 TTS，不阻塞转录的接收。
+            self.active_llm_task = asyncio.create_task(self._process_llm_and_tts(transcript))
+
+    @staticmethod
+    async def _receive_audio(websocket: WebSocket, audio_queue: asyncio.Queue[bytes | None]):
+        """
+        后台任务：持续接收客户端发来的音频并放入队列，连接结束时放入 None 作为结束标志。
+
+        接收与处理分离后，处理音频 (例如等待 ASR 推理) 期间到达的消息会在队列中积累，
+        并在下一次处理时被合并，从而减少 VAD 和 ASR 的调用次数。
+        """
+        try:
+            async for audio_chunk in websocket.iter_bytes():
+                await audio_queue.put(audio_chunk)
+        except asyncio.CancelledError:
+            # 被取消时处理循环已经停止，不会再消费队列，队列可能一直是满的。
+            # 这里不能等待放入结束标志，否则任务会永远挂起；放不下就直接放弃。
+            with suppress(asyncio.QueueFull):
+                audio_queue.put_nowait(None)
+            raise
+        except Exception:
+            # 接收出错时处理循环仍在等待数据：放入结束标志让它退出，再由它取得这里的异常。
+            await audio_queue.put(None)
+            raise
+        await audio_queue.put(None)
+
+    @staticmethod
+    async def _next_audio_batch(audio_queue: asyncio.Queue[bytes | None]) -> bytes | None:
+        """
+        等待下一条音频消息，并一并取出队列中已经到达的其他消息，合并为一个字节串。
+
+        返回:
+            bytes | None: 合并后的音频数据；如果接收已经结束，则返回 None。
+        """
+        audio_chunk = await audio_queue.get()
+        if audio_chunk is None:
+            return None
+
+        audio_chunks = [audio_chunk]
+        while not audio_queue.empty():
+            audio_chunk = audio_queue.get_nowait()
+            if audio_chunk is None:
+                # 把结束标志放回队列，留给下一次调用。刚刚取出过一项，队列一定有空位。
+                audio_queue.put_nowait(None)
+                break
+            audio_chunks.append(audio_chunk)
+        return audio_chunks[0] if len(audio_chunks) == 1 else b"".join(audio_chunks)
+
+    def _detect_speech(self, audio_chunk: bytes) -> bool:
+        """
+        将音频追加到 VAD 缓冲区，并对其中所有 VAD 模型期望大小的完整块进行语音检测。
+
+        块通过读指针在缓冲区中逐个定位，并以 memoryview 的形式直接交给 VAD，不复制数据；
+        已消费的前缀在检测结束后一次性删除，不足一块的剩余数据留待下次使用。
+
+        参数:
+            audio_chunk: 新接收到的原始音频数据。
+
+        返回:
+            bool: 是否有任意一个完整块包含语音。
+        """
+        buffer = self._vad_buffer
+        buffer.extend(audio_chunk)
+        chunk_size = self.VAD_CHUNK_SIZE
+        buffered = len(buffer)
+        consumed = buffered - buffered % chunk_size
+        if not consumed:
+            return False
+
+        # 视图只在这次调用期间存活：缓冲区被导出时无法改变大小，必须先释放视图再删除前缀。
+        with memoryview(buffer) as view:
+            speech_flags = self.vad.is_speech_batch(
+                [view[head : head + chunk_size] for head in range(0, consumed, chunk_size)]
+            )
+        # CPython 的 bytearray 删除前缀时只移动起始偏移量，不会复制剩余的数据。
+        del buffer[:consumed]
+        return any(speech_flags)
+
+    async def _process_llm_and_tts(self, text: str):
+        """
+        后台任务：流式调用 LLM 获取回复，每得到一个完整的句子就立即合成语音并放入播放队列，
+        使 LLM 的生成与 TTS 的合成在时间上重叠，降低首段音频的延迟。
+
+        参数:
+            text (str): ASR 识别出的文本。
+        """
+        try:
+            # 任务被取消时，`aclosing` 立即关闭 LLM 的流式生成器，而不是等到它被垃圾回收。
+            async with aclosing(self.llm.chat_stream(text)) as text_stream:
+                async for sentence in split_sentences(text_stream):
+                    await self._queue_tts_audio(sentence)
 
             logger.info("TTS音频流发送完毕。")
 
@@ -120,3 +303,29 @@ class VoicePipeline:
             logger.info("LLM/TTS 任务被成功取消。")
         except Exception as e:
             logger.error("在LLM/TTS后台任务中发生错误", exc_info=e)
+
+    async def _queue_tts_audio(self, sentence: str):
+        """
+        合成一个句子的语音并放入播放队列。播放队列已满时会在这里等待。
+
+        TTS 产生的小块音频会先累积起来，达到 `TTS_SEND_BUFFER_SIZE` 后再合并为一个消息，
+        减少 WebSocket 帧的数量；句子结束时放入剩余的数据。MP3 数据按帧自同步，
+        因此合并发送不影响客户端解码。
+
+        参数:
+            sentence (str): 需要合成的句子。
+        """
+        playback_queue = self._playback_queue
+        pending = bytearray()
+        first_chunk = True
+        async for tts_chunk in self.tts.stream(sentence):
+            if first_chunk:
+                first_chunk = False
+                await playback_queue.put(tts_chunk)
+                continue
+            pending += tts_chunk
+            if len(pending) >= TTS_SEND_BUFFER_SIZE:
+                await playback_queue.put(bytes(pending))
+                pending.clear()
+        if pending:
+            await playback_queue.put(bytes(pending))